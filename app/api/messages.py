@@ -1,28 +1,91 @@
 """Message API endpoints."""
 
+import logging
+from operator import attrgetter
+from typing import Annotated
+
+from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.core.cache import PageCache
 from app.core.logging import logger
-from fastapi import APIRouter, HTTPException, Query, status
+from app.core.pagination import decode_cursor, encode_cursor
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
 
 from app.db.session import DbSession
 from app.models import Message
 from app.schemas.message import MessageCreate, MessageRead, PaginatedMessages
-from app.services.messages import create_message, get_messages_by_room
+from app.services.messages import get_messages_by_room
+from app.services.write_queue import WriteQueue
 
 router = APIRouter(prefix="/api/v1", tags=["messages"])
 
+# Reads all MessageRead fields from a row in one C-level call
+_message_fields = attrgetter("id", "room_id", "sender", "content", "created_at")
+
+
+async def parse_message_create(request: Request) -> MessageCreate:
+    """Decode and validate the request body in a single pydantic-core pass.
+
+    Args:
+        request: Incoming HTTP request.
+
+    Returns:
+        Validated message creation data.
+
+    Raises:
+        RequestValidationError: If the body is not sent as JSON, is not valid
+            JSON or fails validation (422).
+    """
+    body = await request.body()
+    # Only JSON media types are parsed, as FastAPI's own body handling does;
+    # this also keeps cross-origin "simple" (e.g. text/plain) POSTs out.
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    maintype, _, subtype = media_type.partition("/")
+    if maintype != "application" or not (subtype == "json" or subtype.endswith("+json")):
+        raise RequestValidationError(
+            [
+                {
+                    "type": "model_attributes_type",
+                    "loc": ("body",),
+                    "msg": "Input should be a valid dictionary or object to extract fields from",
+                    "input": body.decode(errors="replace"),
+                }
+            ]
+        )
+    try:
+        return MessageCreate.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
 
-@router.post("/messages", response_model=MessageRead, status_code=201)
+@router.post(
+    "/messages",
+    response_model=MessageRead,
+    status_code=201,
+    # The body is parsed by a dependency, so document it explicitly; the
+    # MessageCreate component itself is registered in app.main
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/MessageCreate"}}},
+        }
+    },
+)
 async def create_message_endpoint(
-    data: MessageCreate,
-    db: DbSession,
+    data: Annotated[MessageCreate, Depends(parse_message_create)],
+    queue: WriteQueue,
+    cache: PageCache,
 ) -> MessageRead:
     """Create a new message.
 
     Args:
         data: Message creation data.
-        db: Database session.
+        queue: Write queue that batches concurrent inserts into one commit.
+        cache: Room page cache, invalidated for the message's room.
 
     Returns:
         The created message.
@@ -31,12 +94,20 @@ async def create_message_endpoint(
         HTTPException: If database error occurs.
     """
     try:
-        message: Message = await create_message(db, data)
-        logger.info("Message created", extra={"message_id": message.id, "room_id": message.room_id})
-        return MessageRead.model_validate(message)
+        message: Message = await queue.submit(data)
+        # Skip building the extra dict when INFO is disabled
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Message created", extra={"message_id": message.id, "room_id": message.room_id})
+        await cache.invalidate(message.room_id)
+        return MessageRead.model_construct(
+            id=message.id,
+            room_id=message.room_id,
+            sender=message.sender,
+            content=message.content,
+            created_at=message.created_at,
+        )
     except SQLAlchemyError as e:
         logger.error("Database error creating message", extra={"error": str(e)})
-        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create message",
@@ -47,42 +118,78 @@ async def create_message_endpoint(
 async def get_room_messages(
     room_id: str,
     db: DbSession,
+    cache: PageCache,
     limit: int = Query(default=20, ge=1, le=100, description="Maximum number of messages to return"),
     offset: int = Query(default=0, ge=0, description="Number of messages to skip"),
-) -> PaginatedMessages:
+    cursor: str | None = Query(default=None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(default=False, description="Whether to count all messages in the room"),
+) -> Response:
     """Get paginated messages for a room.
 
+    A room without messages is an empty collection: the response is 200 with
+    `{"items": [], "total": 0, ...}` (total only when `include_total=true`).
+
     Args:
         room_id: Room identifier.
         db: Database session.
+        cache: Room page cache.
         limit: Maximum number of messages to return (1-100).
         offset: Number of messages to skip.
+        cursor: Opaque keyset cursor; mutually exclusive with offset.
+        include_total: Whether to compute the total message count.
 
     Returns:
-        Paginated messages response. Returns empty list if no messages found.
+        Serialized PaginatedMessages JSON, served from cache when available.
+        Returns empty list if no messages found.
 
     Raises:
-        HTTPException: If room does not exist (404) or database error occurs (500).
+        HTTPException: If the cursor is invalid (400) or database error occurs (500).
     """
-    try:
-        messages, total = await get_messages_by_room(db, room_id, limit, offset)
-        
-        # Optional: Return 404 if room has never had messages (first page, no results)
-        if total == 0 and offset == 0:
+    after_id = None
+    if cursor is not None:
+        if offset:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Room '{room_id}' not found",
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either cursor or offset, not both",
             )
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+
+    page_key = f"{limit}:{offset}:{cursor}:{include_total}"
+    # Read the room version before the DB so a write committed meanwhile blocks the cache fill
+    cached, cache_version = await cache.get(room_id, page_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    try:
+        messages, total = await get_messages_by_room(
+            db, room_id, limit, offset, after_id=after_id, include_total=include_total
+        )
         
-        logger.info("Retrieved room messages", extra={"room_id": room_id, "count": len(messages), "total": total})
-        return PaginatedMessages(
-            items=[MessageRead.model_validate(msg) for msg in messages],
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved room messages", extra={"room_id": room_id, "count": len(messages), "total": total})
+        # Rows come straight from typed DB columns, so skip Pydantic validation
+        build_item = MessageRead.model_construct
+        page = PaginatedMessages.model_construct(
+            items=[
+                build_item(id=id_, room_id=room, sender=sender, content=content, created_at=created_at)
+                for id_, room, sender, content, created_at in map(_message_fields, messages)
+            ],
             total=total,
             limit=limit,
             offset=offset,
+            next_cursor=encode_cursor(messages[-1].id) if len(messages) == limit else None,
         )
-    except HTTPException:
-        raise
+        # Serialize once in pydantic-core; returning a Response skips FastAPI's
+        # response_model re-validation (the model is kept for the OpenAPI schema)
+        payload = page.__pydantic_serializer__.to_json(page)
+        await cache.set(room_id, cache_version, page_key, payload)
+        return Response(content=payload, media_type="application/json")
     except SQLAlchemyError as e:
         logger.error("Database error retrieving messages", extra={"room_id": room_id, "error": str(e)})
         raise HTTPException(
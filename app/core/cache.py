@@ -0,0 +1,122 @@
+"""Redis response cache for room message pages."""
+
+import os
+from typing import Annotated
+
+from fastapi import Depends
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from app.core.logging import logger
+
+# Caching is disabled unless a Redis URL is configured
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TTL_SECONDS = 60
+
+
+class RoomPageCache:
+    """Cache of serialized message pages, one Redis hash per room version.
+
+    Each room has a version counter; its pages live in a hash keyed by the
+    current version, so a new message invalidates them all with one INCR
+    instead of a key scan. A page is only stored if the room's version is
+    still the one read before the page was built, so a read that raced a
+    write cannot cache stale rows. Redis errors are logged and treated as
+    cache misses.
+    """
+
+    def __init__(self, redis: Redis | None, ttl: int = CACHE_TTL_SECONDS) -> None:
+        self._redis = redis
+        self._ttl = ttl
+
+    @staticmethod
+    def _version_key(room_id: str) -> str:
+        return f"msg-cache:room:{room_id}:v"
+
+    @staticmethod
+    def _pages_key(room_id: str, version: int) -> str:
+        return f"msg-cache:room:{room_id}:{version}"
+
+    async def get(self, room_id: str, page_key: str) -> tuple[bytes | None, int]:
+        """Return a cached page payload and the room version it was looked up at.
+
+        Args:
+            room_id: Room identifier.
+            page_key: Identifies the page within the room (pagination params).
+
+        Returns:
+            Tuple of (serialized JSON payload or None on miss, room version).
+            Pass the version to `set` when caching a page built after this call.
+        """
+        if self._redis is None:
+            return None, 0
+        try:
+            version = int(await self._redis.get(self._version_key(room_id)) or 0)
+            return await self._redis.hget(self._pages_key(room_id, version), page_key), version
+        except RedisError as e:
+            logger.warning("Cache read failed", extra={"room_id": room_id, "error": str(e)})
+            return None, 0
+
+    async def set(self, room_id: str, version: int, page_key: str, payload: bytes) -> None:
+        """Store a serialized page payload unless the room changed since `version` was read.
+
+        Args:
+            room_id: Room identifier.
+            version: Room version returned by the `get` that preceded building the page.
+            page_key: Identifies the page within the room (pagination params).
+            payload: Serialized JSON payload.
+        """
+        if self._redis is None:
+            return
+        version_key = self._version_key(room_id)
+        pages_key = self._pages_key(room_id, version)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                # WATCH aborts the write if an invalidation bumps the version before EXEC
+                await pipe.watch(version_key)
+                if int(await pipe.get(version_key) or 0) != version:
+                    return
+                pipe.multi()
+                # The version key outlives every page hash, so an expired counter
+                # cannot restart at a version whose old pages are still cached
+                pipe.hset(pages_key, page_key, payload).expire(pages_key, self._ttl)
+                pipe.expire(version_key, 2 * self._ttl)
+                await pipe.execute()
+        except WatchError:
+            return
+        except RedisError as e:
+            logger.warning("Cache write failed", extra={"room_id": room_id, "error": str(e)})
+
+    async def invalidate(self, room_id: str) -> None:
+        """Drop all cached pages of a room by moving it to a new version.
+
+        Pages of older versions are no longer read and expire with their TTL.
+
+        Args:
+            room_id: Room identifier.
+        """
+        if self._redis is None:
+            return
+        version_key = self._version_key(room_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                await pipe.incr(version_key).expire(version_key, 2 * self._ttl).execute()
+        except RedisError as e:
+            logger.warning("Cache invalidation failed", extra={"room_id": room_id, "error": str(e)})
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+page_cache = RoomPageCache(Redis.from_url(REDIS_URL) if REDIS_URL else None)
+
+
+def get_page_cache() -> RoomPageCache:
+    """FastAPI dependency for the room page cache."""
+    return page_cache
+
+
+# Type alias for dependency injection
+PageCache = Annotated[RoomPageCache, Depends(get_page_cache)]
@@ -1,10 +1,19 @@
 """Logging configuration."""
 
-import json
 import logging
 import sys
 from datetime import datetime, timezone
 
+import orjson
+
+# Standard LogRecord attributes that are not user-supplied extra fields
+_EXCLUDED_FIELDS = frozenset({
+    "name", "msg", "args", "created", "filename", "funcName",
+    "levelname", "levelno", "lineno", "module", "msecs",
+    "message", "pathname", "process", "processName", "relativeCreated",
+    "thread", "threadName", "exc_info", "exc_text", "stack_info",
+})
+
 
 class StructuredFormatter(logging.Formatter):
     """Custom formatter that outputs JSON-like structured logs."""
@@ -19,7 +28,8 @@ class StructuredFormatter(logging.Formatter):
             JSON-like formatted log string.
         """
         log_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            # Reuse the record's own timestamp; orjson formats it natively
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
             "level": record.levelname,
             "message": record.getMessage(),
             "module": f"{record.module}.{record.funcName}",
@@ -30,17 +40,11 @@ class StructuredFormatter(logging.Formatter):
             log_data["exception"] = self.formatException(record.exc_info)
 
         # Add extra fields (excluding internal logging fields)
-        excluded_fields = {
-            "name", "msg", "args", "created", "filename", "funcName",
-            "levelname", "levelno", "lineno", "module", "msecs",
-            "message", "pathname", "process", "processName", "relativeCreated",
-            "thread", "threadName", "exc_info", "exc_text", "stack_info",
-        }
         for key, value in record.__dict__.items():
-            if key not in excluded_fields and not key.startswith("_"):
+            if key not in _EXCLUDED_FIELDS and not key.startswith("_"):
                 log_data[key] = value
 
-        return json.dumps(log_data, ensure_ascii=False)
+        return orjson.dumps(log_data, default=str, option=orjson.OPT_UTC_Z).decode()
 
 
 def setup_logging(level: str = "INFO") -> logging.Logger:
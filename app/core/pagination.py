@@ -0,0 +1,37 @@
+"""Opaque cursor helpers for keyset pagination."""
+
+import base64
+import binascii
+
+
+def encode_cursor(message_id: int) -> str:
+    """Encode the last seen message id as an opaque cursor.
+
+    Args:
+        message_id: Id of the last message on the current page.
+
+    Returns:
+        URL-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(str(message_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor: Cursor string received from the client.
+
+    Returns:
+        Id of the last message seen by the client.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        message_id = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if message_id < 1:
+        raise ValueError("Invalid cursor")
+    return message_id
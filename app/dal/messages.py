@@ -1,11 +1,21 @@
 """Data access layer for message database operations."""
 
-from sqlalchemy import func, select
+from datetime import datetime
+
+from sqlalchemy import Row, func, insert, lambda_stmt, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.message import Message
 from app.schemas.message import MessageCreate
 
+# (id, room_id, sender, content, created_at) as returned by room listings
+MessageRow = Row[tuple[int, str, str, str, datetime]]
+
+# INSERT statements are fixed shapes built once; values are bound per call.
+# RETURNING fetches the generated id/created_at in the INSERT round-trip.
+_INSERT_MESSAGE = insert(Message).returning(Message)
+_INSERT_MESSAGES = insert(Message).returning(Message, sort_by_parameter_order=True)
+
 
 async def create_message(db: AsyncSession, data: MessageCreate) -> Message:
     """Create and persist a new message.
@@ -17,46 +27,104 @@ async def create_message(db: AsyncSession, data: MessageCreate) -> Message:
     Returns:
         The created message instance.
     """
-    message = Message(
-        room_id=data.room_id,
-        sender=data.sender,
-        content=data.content,
-    )
-    db.add(message)
+    message = await db.scalar(_INSERT_MESSAGE, data.model_dump())
     await db.commit()
-    await db.refresh(message)
     return message
 
 
+async def create_messages(db: AsyncSession, items: list[MessageCreate]) -> list[Message]:
+    """Persist several messages in a single transaction.
+
+    Args:
+        db: Database session.
+        items: Message creation data, one entry per message.
+
+    Returns:
+        The created messages, in the same order as `items`.
+    """
+    result = await db.scalars(_INSERT_MESSAGES, [item.model_dump() for item in items])
+    messages = list(result.all())
+    await db.commit()
+    return messages
+
+
 async def get_messages_by_room(
-    db: AsyncSession, room_id: str, limit: int, offset: int
-) -> tuple[list[Message], int]:
+    db: AsyncSession,
+    room_id: str,
+    limit: int,
+    offset: int = 0,
+    *,
+    after_id: int | None = None,
+    include_total: bool = False,
+) -> tuple[list[MessageRow], int | None]:
     """Get paginated messages for a room.
 
+    Messages are ordered by (created_at, id). When `after_id` is given the
+    page starts right after that message (keyset pagination) and `offset`
+    is ignored. Rows are read-only tuples exposing the message columns as
+    attributes, not ORM instances.
+
     Args:
         db: Database session.
         room_id: Room identifier to filter by.
         limit: Maximum number of messages to return.
         offset: Number of messages to skip.
+        after_id: Id of the last message of the previous page.
+        include_total: Whether to count all messages in the room.
 
     Returns:
-        Tuple of (messages list, total count).
+        Tuple of (message rows, total count or None if not requested).
     """
-    # Get total count
-    count_query = select(func.count()).select_from(Message).where(Message.room_id == room_id)
-    result = await db.execute(count_query)
-    total = result.scalar_one()
-
-    # Get paginated messages ordered by created_at ascending
-    messages_query = (
-        select(Message)
+    # Plain columns skip ORM entity construction and identity-map bookkeeping.
+    # lambda_stmt caches the built statement and its compiled SQL per shape;
+    # each call only re-binds the closure values (room_id, limit, offset, after_id)
+    messages_query = lambda_stmt(
+        lambda: select(Message.id, Message.room_id, Message.sender, Message.content, Message.created_at)
         .where(Message.room_id == room_id)
-        .order_by(Message.created_at.asc())
+        .order_by(Message.created_at.asc(), Message.id.asc())
         .limit(limit)
-        .offset(offset)
+    )
+    if after_id is not None:
+        # Compare against the stored row so both sides share the DB's datetime format
+        messages_query += lambda s: s.where(
+            tuple_(Message.created_at, Message.id)
+            > select(Message.created_at, Message.id)
+            .where(Message.id == after_id)
+            .correlate(None)
+            .scalar_subquery()
+        )
+    else:
+        messages_query += lambda s: s.offset(offset)
+
+    if not include_total:
+        result = await db.execute(messages_query)
+        return list(result.all()), None
+
+    # Carry the room total as an uncorrelated scalar subquery: SQLite evaluates it
+    # once from the covering index, in the same round-trip as the page.
+    # (A window count would be narrowed by the keyset predicate and makes SQLite
+    # materialize every row of the room.)
+    messages_query += lambda s: s.add_columns(
+        select(func.count())
+        .select_from(Message)
+        .where(Message.room_id == room_id)
+        .correlate(None)
+        .scalar_subquery()
+        .label("total")
     )
     result = await db.execute(messages_query)
-    messages = list(result.scalars().all())
+    rows = result.all()
+    if rows:
+        return list(rows), rows[0].total
+
+    # An empty page has no row to carry the total (e.g. past the last page)
+    return [], await _count_messages(db, room_id)
 
-    return messages, total
 
+async def _count_messages(db: AsyncSession, room_id: str) -> int:
+    """Count all messages in a room."""
+    count_query = lambda_stmt(
+        lambda: select(func.count()).select_from(Message).where(Message.room_id == room_id)
+    )
+    result = await db.execute(count_query)
+    return result.scalar_one()
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
@@ -24,11 +25,34 @@ else:
     if SQLALCHEMY_DATABASE_URL.startswith("sqlite:///"):
         SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
 
+# Schema creation is a deploy step (init_db.py); INIT_DB=1 also runs it at startup
+INIT_DB = os.getenv("INIT_DB") == "1"
+
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     echo=False,
 )
 
+# WAL lets readers proceed during writes; NORMAL sync is durable under WAL
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+        """Apply performance PRAGMAs to every new SQLite connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -36,13 +60,17 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+async def create_tables() -> None:
+    """Create all tables and indexes that do not exist yet."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency for async database session."""
+    # The context manager closes the session on exit
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
 
 
 # Type alias for dependency injection
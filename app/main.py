@@ -4,19 +4,23 @@ from fastapi import FastAPI
 
 from app.api.health import router as health_router
 from app.api.messages import router as messages_router
-from app.db.base import Base
-from app.db.session import engine
+from app.core.cache import page_cache
+from app.db.session import INIT_DB, create_tables
 from app.models import Message  # noqa: F401 - Import to register models
+from app.schemas.message import MessageCreate
+from app.services.write_queue import write_queue
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown."""
-    # Startup
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Startup: skip schema introspection unless explicitly requested
+    if INIT_DB:
+        await create_tables()
     yield
-    # Shutdown (if needed in the future)
+    # Shutdown: flush queued writes before releasing connections
+    await write_queue.stop()
+    await page_cache.close()
 
 
 app = FastAPI(
@@ -31,3 +35,15 @@ app.include_router(health_router)
 app.include_router(messages_router)
 
 
+def openapi() -> dict:
+    """Build the OpenAPI schema, adding request models FastAPI cannot see."""
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        # POST /messages parses its body in a dependency and references this by $ref
+        schema["components"]["schemas"]["MessageCreate"] = MessageCreate.model_json_schema(
+            ref_template="#/components/schemas/{model}"
+        )
+    return app.openapi_schema
+
+
+app.openapi = openapi
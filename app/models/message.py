@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import String, func
+from sqlalchemy import Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -12,9 +12,14 @@ class Message(Base):
     """Message ORM model."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves room filtering, (created_at, id) ordering and keyset seeks;
+        # its room_id prefix also covers COUNT(*) per room
+        Index("ix_messages_room_created_id", "room_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    room_id: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    room_id: Mapped[str] = mapped_column(String, nullable=False)
     sender: Mapped[str] = mapped_column(String, nullable=False)
     content: Mapped[str] = mapped_column(String, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
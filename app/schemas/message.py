@@ -31,8 +31,9 @@ class PaginatedMessages(BaseModel):
     """Schema for paginated message responses."""
 
     items: list[MessageRead]
-    total: int
+    total: int | None = None
     limit: int
     offset: int
+    next_cursor: str | None = None
 
     model_config = ConfigDict(from_attributes=True)
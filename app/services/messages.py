@@ -1,10 +1,27 @@
 """Message business logic services."""
 
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dal.messages import create_message as dal_create_message, get_messages_by_room as dal_get_messages_by_room
+from app.dal.messages import (
+    MessageRow,
+    create_message as dal_create_message,
+    create_messages as dal_create_messages,
+    get_messages_by_room as dal_get_messages_by_room,
+)
 from app.models.message import Message
 from app.schemas.message import MessageCreate
+from app.services.messages_cache import room_prefix_cache
+
+# Room totals are cached only for large rooms, where COUNT(*) is the dominant
+# cost of a page; smaller rooms are counted exactly on every request.
+COUNT_CACHE_TTL = 30.0
+COUNT_CACHE_MIN_TOTAL = 1000
+COUNT_CACHE_MAX_ROOMS = 1024
+
+# room_id -> (total, monotonic time it was counted)
+_count_cache: dict[str, tuple[int, float]] = {}
 
 
 async def create_message(db: AsyncSession, data: MessageCreate) -> Message:
@@ -17,12 +34,36 @@ async def create_message(db: AsyncSession, data: MessageCreate) -> Message:
     Returns:
         The created message instance.
     """
-    return await dal_create_message(db, data)
+    message = await dal_create_message(db, data)
+    room_prefix_cache.invalidate(data.room_id)
+    return message
+
+
+async def create_messages_bulk(db: AsyncSession, items: list[MessageCreate]) -> list[Message]:
+    """Create several messages with one INSERT and one commit.
+
+    Args:
+        db: Database session.
+        items: Message creation data, one entry per message.
+
+    Returns:
+        The created messages, in the same order as `items`.
+    """
+    messages = await dal_create_messages(db, items)
+    for room_id in {item.room_id for item in items}:
+        room_prefix_cache.invalidate(room_id)
+    return messages
 
 
 async def get_messages_by_room(
-    db: AsyncSession, room_id: str, limit: int, offset: int
-) -> tuple[list[Message], int]:
+    db: AsyncSession,
+    room_id: str,
+    limit: int,
+    offset: int = 0,
+    *,
+    after_id: int | None = None,
+    include_total: bool = False,
+) -> tuple[list[MessageRow], int | None]:
     """Get paginated messages for a room.
 
     Args:
@@ -30,8 +71,63 @@ async def get_messages_by_room(
         room_id: Room identifier to filter by.
         limit: Maximum number of messages to return.
         offset: Number of messages to skip.
+        after_id: Id of the last message of the previous page (keyset pagination).
+        include_total: Whether to count all messages in the room.
 
     Returns:
-        Tuple of (messages list, total count).
+        Tuple of (message rows, total count or None if not requested).
+        Totals of rooms with at least COUNT_CACHE_MIN_TOTAL messages may be
+        up to COUNT_CACHE_TTL seconds old. Offset pages within a room's first
+        PREFIX_SIZE messages are served from the in-process prefix cache.
     """
-    return await dal_get_messages_by_room(db, room_id, limit, offset)
+    if after_id is None:
+        prefix = await _room_prefix(db, room_id, limit, offset)
+        if prefix is not None:
+            page = prefix[offset : offset + limit]
+            if not include_total:
+                return page, None
+            if len(prefix) < room_prefix_cache.size:
+                # A short prefix holds the whole room
+                return page, len(prefix)
+            total = _cached_count(room_id)
+            if total is not None:
+                return page, total
+
+    if include_total:
+        total = _cached_count(room_id)
+        if total is not None:
+            messages, _ = await dal_get_messages_by_room(db, room_id, limit, offset, after_id=after_id)
+            return messages, total
+
+    messages, total = await dal_get_messages_by_room(
+        db, room_id, limit, offset, after_id=after_id, include_total=include_total
+    )
+    if total is not None and total >= COUNT_CACHE_MIN_TOTAL:
+        _count_cache.pop(room_id, None)
+        if len(_count_cache) >= COUNT_CACHE_MAX_ROOMS:
+            del _count_cache[next(iter(_count_cache))]
+        _count_cache[room_id] = (total, time.monotonic())
+    return messages, total
+
+
+async def _room_prefix(db: AsyncSession, room_id: str, limit: int, offset: int) -> list[MessageRow] | None:
+    """Return the room's cached first rows if they cover the requested page, loading them on a miss."""
+    if not room_prefix_cache.enabled or offset + limit > room_prefix_cache.size:
+        return None
+    prefix = room_prefix_cache.get(room_id)
+    if prefix is None:
+        generation = room_prefix_cache.generation()
+        prefix, _ = await dal_get_messages_by_room(db, room_id, room_prefix_cache.size)
+        room_prefix_cache.set(room_id, generation, prefix)
+    return prefix
+
+
+def _cached_count(room_id: str) -> int | None:
+    """Return the room's cached total if it is still fresh."""
+    cached = _count_cache.get(room_id)
+    if cached is None:
+        return None
+    if time.monotonic() - cached[1] >= COUNT_CACHE_TTL:
+        del _count_cache[room_id]
+        return None
+    return cached[0]
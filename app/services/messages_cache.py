@@ -0,0 +1,119 @@
+"""In-process cache of the oldest messages of recently read rooms."""
+
+import time
+
+from app.core.cache import REDIS_URL
+from app.dal.messages import MessageRow
+
+# Offset pages ending within the first PREFIX_SIZE messages of a room are
+# sliced from memory instead of re-running the listing query.
+PREFIX_SIZE = 200
+PREFIX_TTL = 10.0
+MAX_ROOMS = 1024
+MAX_BYTES = 16 * 1024 * 1024
+# Rough per-row cost of the Row, its int and datetime, on top of the strings
+ROW_OVERHEAD_BYTES = 200
+
+
+class RoomPrefixCache:
+    """Cache of the first `size` rows of each room, ordered by (created_at, id).
+
+    Entries expire after `ttl` seconds and are dropped when a message is
+    created in the room by this process. At most `max_rooms` rooms and
+    roughly `max_bytes` of rows are kept; the oldest entry is evicted first.
+    A `size` of 0 disables the cache.
+
+    Reads that raced a write must not be stored: take `generation()` before
+    reading the rows and pass it to `set`, which drops the rows if the room
+    was invalidated in between.
+    """
+
+    def __init__(
+        self,
+        size: int = PREFIX_SIZE,
+        ttl: float = PREFIX_TTL,
+        max_rooms: int = MAX_ROOMS,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.size = size
+        self.ttl = ttl
+        self.max_rooms = max_rooms
+        self.max_bytes = max_bytes
+        # room_id -> (rows, monotonic time they were read, estimated bytes)
+        self._entries: dict[str, tuple[list[MessageRow], float, int]] = {}
+        self._bytes = 0
+        # Bumped on every invalidation; room_id -> generation it was last invalidated at.
+        # Rooms evicted from this map fall back to the newest evicted generation.
+        self._generation = 0
+        self._invalidated: dict[str, int] = {}
+        self._forgotten = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether pages may be served from the cache."""
+        return self.size > 0
+
+    def generation(self) -> int:
+        """Return the current generation, to be passed to `set` after reading rows."""
+        return self._generation
+
+    def get(self, room_id: str) -> list[MessageRow] | None:
+        """Return the cached prefix of a room, or None if missing or expired.
+
+        Args:
+            room_id: Room identifier.
+
+        Returns:
+            Up to `size` rows; fewer means the prefix is the whole room.
+        """
+        entry = self._entries.get(room_id)
+        if entry is None:
+            return None
+        rows, stored_at, _ = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            self._evict(room_id)
+            return None
+        return rows
+
+    def set(self, room_id: str, generation: int, rows: list[MessageRow]) -> None:
+        """Store the prefix of a room unless it was invalidated since `generation`.
+
+        Args:
+            room_id: Room identifier.
+            generation: Value of `generation()` taken before the rows were read.
+            rows: The room's first `size` rows.
+        """
+        if self._invalidated.get(room_id, self._forgotten) > generation:
+            return
+        nbytes = sum(len(row.room_id) + len(row.sender) + len(row.content) + ROW_OVERHEAD_BYTES for row in rows)
+        self._evict(room_id)
+        if nbytes > self.max_bytes:
+            return
+        while self._entries and (len(self._entries) >= self.max_rooms or self._bytes + nbytes > self.max_bytes):
+            self._evict(next(iter(self._entries)))
+        self._entries[room_id] = (rows, time.monotonic(), nbytes)
+        self._bytes += nbytes
+
+    def invalidate(self, room_id: str) -> None:
+        """Drop the cached prefix of a room and reject reads already in flight.
+
+        Args:
+            room_id: Room identifier.
+        """
+        self._evict(room_id)
+        self._generation += 1
+        self._invalidated.pop(room_id, None)
+        if len(self._invalidated) >= self.max_rooms:
+            self._forgotten = self._invalidated.pop(next(iter(self._invalidated)))
+        self._invalidated[room_id] = self._generation
+
+    def _evict(self, room_id: str) -> None:
+        """Remove a room's entry, if any, and release its bytes."""
+        entry = self._entries.pop(room_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+# Redis already caches whole pages across workers; a second in-process layer
+# under it would only hold rows Redis has, and could write stale pages back.
+room_prefix_cache = RoomPrefixCache(size=0 if REDIS_URL else PREFIX_SIZE)
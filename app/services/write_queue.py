@@ -0,0 +1,124 @@
+"""Batched write path for new messages."""
+
+import asyncio
+from contextlib import AbstractAsyncContextManager, suppress
+from typing import Annotated, Callable
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import logger
+from app.db.session import AsyncSessionLocal
+from app.models.message import Message
+from app.schemas.message import MessageCreate
+from app.services.messages import create_messages_bulk
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+
+class MessageWriteQueue:
+    """Coalesces concurrent message writes into shared transactions.
+
+    Callers await `submit`; a single background worker persists up to
+    `max_batch` queued messages per commit. Messages that queue up while a
+    commit is in flight form the next batch. Only when messages were already
+    waiting (i.e. under load) does the worker hold a batch open for up to
+    `max_wait` seconds to fill it; an isolated write is committed at once.
+    The worker starts on first use.
+    """
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        max_batch: int = 100,
+        max_wait: float = 0.01,
+    ) -> None:
+        self._session_factory = session_factory
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue[tuple[MessageCreate, asyncio.Future[Message]]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    async def submit(self, data: MessageCreate) -> Message:
+        """Queue a message for writing and wait until it is committed.
+
+        Args:
+            data: Message creation data.
+
+        Returns:
+            The created message.
+
+        Raises:
+            SQLAlchemyError: If the batch containing the message fails.
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future: asyncio.Future[Message] = asyncio.get_running_loop().create_future()
+        await self._queue.put((data, future))
+        return await future
+
+    async def stop(self) -> None:
+        """Flush pending writes and stop the worker."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        self._queue = None
+
+    async def _run(self) -> None:
+        """Collect batches from the queue and write them until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if 1 < len(batch) < self._max_batch:
+                deadline = loop.time() + self._max_wait
+                while len(batch) < self._max_batch:
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            batch.append(await self._queue.get())
+                    except TimeoutError:
+                        break
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain(self, batch: list[tuple[MessageCreate, asyncio.Future[Message]]]) -> None:
+        """Move already queued messages into the batch without waiting."""
+        while len(batch) < self._max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _write(self, batch: list[tuple[MessageCreate, asyncio.Future[Message]]]) -> None:
+        """Persist one batch and resolve its callers' futures."""
+        try:
+            async with self._session_factory() as session:
+                messages = await create_messages_bulk(session, [data for data, _ in batch])
+        except Exception as e:
+            logger.error("Batch write failed", extra={"batch_size": len(batch), "error": str(e)})
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), message in zip(batch, messages):
+            # The caller may have gone away (e.g. client disconnect)
+            if not future.done():
+                future.set_result(message)
+
+
+write_queue = MessageWriteQueue(AsyncSessionLocal)
+
+
+def get_write_queue() -> MessageWriteQueue:
+    """FastAPI dependency for the message write queue."""
+    return write_queue
+
+
+# Type alias for dependency injection
+WriteQueue = Annotated[MessageWriteQueue, Depends(get_write_queue)]
@@ -1,11 +1,11 @@
 """Initialize database tables."""
 
-from app.db.base import Base
-from app.db.session import engine
+import asyncio
+
+from app.db.session import create_tables
 from app.models import Message  # noqa: F401 - Import to register models
 
 if __name__ == "__main__":
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    asyncio.run(create_tables())
     print("Database tables created successfully!")
-
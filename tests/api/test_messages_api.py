@@ -3,18 +3,50 @@
 import pytest
 from fastapi import status
 
+from app.core.cache import RoomPageCache, get_page_cache
+from app.main import app
+from app.services.messages import get_messages_by_room
+
+
+class InMemoryPageCache(RoomPageCache):
+    """Dict-backed page cache standing in for Redis, with the same room versioning."""
+
+    def __init__(self):
+        super().__init__(redis=None)
+        self.pages: dict[tuple[str, str], bytes] = {}
+        self.versions: dict[str, int] = {}
+
+    async def get(self, room_id, page_key):
+        return self.pages.get((room_id, page_key)), self.versions.get(room_id, 0)
+
+    async def set(self, room_id, version, page_key, payload):
+        if self.versions.get(room_id, 0) == version:
+            self.pages[(room_id, page_key)] = payload
+
+    async def invalidate(self, room_id):
+        self.versions[room_id] = self.versions.get(room_id, 0) + 1
+        self.pages = {key: value for key, value in self.pages.items() if key[0] != room_id}
+
+
+@pytest.fixture
+def page_cache(client):
+    """Enable an in-memory page cache for the test client."""
+    cache = InMemoryPageCache()
+    app.dependency_overrides[get_page_cache] = lambda: cache
+    return cache
+
 
 class TestCreateMessage:
     """Tests for POST /api/v1/messages endpoint."""
 
-    def test_create_message_success(self, client):
+    async def test_create_message_success(self, client):
         """Happy path: POST /api/v1/messages returns 201 and correct payload."""
         payload = {
             "room_id": "room-123",
             "sender": "user-1",
             "content": "Hello, world!",
         }
-        response = client.post("/api/v1/messages", json=payload)
+        response = await client.post("/api/v1/messages", json=payload)
 
         assert response.status_code == status.HTTP_201_CREATED
         data = response.json()
@@ -24,36 +56,68 @@ class TestCreateMessage:
         assert "id" in data
         assert "created_at" in data
 
-    def test_create_message_missing_field(self, client):
+    async def test_create_message_missing_field(self, client):
         """Validation error: POST /api/v1/messages with missing required field returns 422."""
         payload = {
             "room_id": "room-123",
             "sender": "user-1",
             # Missing 'content' field
         }
-        response = client.post("/api/v1/messages", json=payload)
+        response = await client.post("/api/v1/messages", json=payload)
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
-    def test_create_message_invalid_field_type(self, client):
+    async def test_create_message_invalid_field_type(self, client):
         """Validation error: POST /api/v1/messages with invalid field type returns 422."""
         payload = {
             "room_id": 123,  # Should be string
             "sender": "user-1",
             "content": "Hello, world!",
         }
-        response = client.post("/api/v1/messages", json=payload)
+        response = await client.post("/api/v1/messages", json=payload)
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
 
-    def test_create_message_empty_content(self, client):
+    async def test_create_message_malformed_json(self, client):
+        """Validation error: POST /api/v1/messages with a body that is not valid JSON returns 422."""
+        response = await client.post(
+            "/api/v1/messages",
+            content=b'{"room_id": "room-123",',
+            headers={"content-type": "application/json"},
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert response.json()["detail"][0]["loc"][0] == "body"
+
+    async def test_create_message_request_body_is_a_named_schema(self, client):
+        """OpenAPI: POST /api/v1/messages references the MessageCreate component."""
+        response = await client.get("/openapi.json")
+
+        openapi = response.json()
+        body = openapi["paths"]["/api/v1/messages"]["post"]["requestBody"]
+        assert body["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/MessageCreate"}
+        assert set(openapi["components"]["schemas"]["MessageCreate"]["required"]) == {"room_id", "sender", "content"}
+
+    @pytest.mark.parametrize("headers", [{"content-type": "text/plain"}, {}])
+    async def test_create_message_requires_json_content_type(self, client, headers):
+        """Validation error: POST /api/v1/messages without a JSON content type returns 422."""
+        response = await client.post(
+            "/api/v1/messages",
+            content=b'{"room_id": "room-123", "sender": "user-1", "content": "Hello"}',
+            headers=headers,
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+        assert response.json()["detail"][0]["loc"] == ["body"]
+
+    async def test_create_message_empty_content(self, client):
         """Validation: POST /api/v1/messages with empty content should be allowed (valid string)."""
         payload = {
             "room_id": "room-123",
             "sender": "user-1",
             "content": "",
         }
-        response = client.post("/api/v1/messages", json=payload)
+        response = await client.post("/api/v1/messages", json=payload)
 
         assert response.status_code == status.HTTP_201_CREATED
         data = response.json()
@@ -63,21 +127,13 @@ class TestCreateMessage:
 class TestGetRoomMessages:
     """Tests for GET /api/v1/rooms/{room_id}/messages endpoint."""
 
-    def test_get_messages_with_pagination(self, client):
+    async def test_get_messages_with_pagination(self, client, seed_messages):
         """Read path: GET /api/v1/rooms/{room_id}/messages returns list with pagination."""
         # Create multiple messages
         room_id = "room-456"
-        for i in range(5):
-            client.post(
-                "/api/v1/messages",
-                json={
-                    "room_id": room_id,
-                    "sender": f"user-{i}",
-                    "content": f"Message {i}",
-                },
-            )
-
-        response = client.get(f"/api/v1/rooms/{room_id}/messages?limit=3&offset=0")
+        await seed_messages(room_id, 5)
+
+        response = await client.get(f"/api/v1/rooms/{room_id}/messages?limit=3&offset=0&include_total=true")
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -88,21 +144,14 @@ class TestGetRoomMessages:
         assert all("id" in item for item in data["items"])
         assert all("created_at" in item for item in data["items"])
 
-    def test_get_messages_empty_result(self, client):
+    async def test_get_messages_empty_result(self, client, seed_messages):
         """Edge case: GET /api/v1/rooms/{room_id}/messages with pagination beyond available messages returns empty list (200)."""
         room_id = "room-789"
         # Create some messages
-        client.post(
-            "/api/v1/messages",
-            json={
-                "room_id": room_id,
-                "sender": "user-1",
-                "content": "Message 1",
-            },
-        )
+        await seed_messages(room_id, 1)
 
         # Request with offset beyond available messages
-        response = client.get(f"/api/v1/rooms/{room_id}/messages?limit=10&offset=100")
+        response = await client.get(f"/api/v1/rooms/{room_id}/messages?limit=10&offset=100&include_total=true")
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
@@ -111,30 +160,97 @@ class TestGetRoomMessages:
         assert data["limit"] == 10
         assert data["offset"] == 100
 
-    def test_get_messages_nonexistent_room(self, client):
-        """Edge case: GET /api/v1/rooms/{room_id}/messages for room with no messages returns 404."""
-        response = client.get("/api/v1/rooms/nonexistent-room/messages")
+    async def test_get_messages_nonexistent_room(self, client):
+        """Edge case: GET /api/v1/rooms/{room_id}/messages for room with no messages returns an empty page."""
+        response = await client.get("/api/v1/rooms/nonexistent-room/messages?include_total=true")
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND
-        assert "not found" in response.json()["detail"].lower()
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["items"] == []
+        assert data["total"] == 0
 
-    def test_get_messages_default_pagination(self, client):
+    async def test_get_messages_default_pagination(self, client, seed_messages):
         """Default pagination parameters work correctly for GET /api/v1/rooms/{room_id}/messages."""
         room_id = "room-default"
-        client.post(
-            "/api/v1/messages",
-            json={
-                "room_id": room_id,
-                "sender": "user-1",
-                "content": "Test message",
-            },
-        )
+        await seed_messages(room_id, 1)
 
-        response = client.get(f"/api/v1/rooms/{room_id}/messages")
+        response = await client.get(f"/api/v1/rooms/{room_id}/messages")
 
         assert response.status_code == status.HTTP_200_OK
         data = response.json()
         assert len(data["items"]) == 1
         assert data["limit"] == 20  # Default limit
         assert data["offset"] == 0  # Default offset
+        assert data["total"] is None  # Not counted unless requested
+        assert data["next_cursor"] is None  # Last page
+
+    async def test_get_messages_cursor_pagination(self, client, seed_messages):
+        """Keyset pagination: next_cursor walks the room without gaps or duplicates."""
+        room_id = "room-cursor"
+        await seed_messages(room_id, 5)
+
+        first = (await client.get(f"/api/v1/rooms/{room_id}/messages?limit=3")).json()
+        assert first["next_cursor"] is not None
+
+        second = (await client.get(f"/api/v1/rooms/{room_id}/messages?limit=3&cursor={first['next_cursor']}")).json()
+        contents = [item["content"] for item in first["items"] + second["items"]]
+        assert contents == [f"Message {i}" for i in range(5)]
+        assert second["next_cursor"] is None
+
+    async def test_get_messages_invalid_cursor(self, client):
+        """Validation error: GET /api/v1/rooms/{room_id}/messages with malformed cursor returns 400."""
+        response = await client.get("/api/v1/rooms/room-1/messages?cursor=not-a-cursor")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_get_messages_cursor_with_offset(self, client):
+        """Validation error: cursor and offset cannot be combined."""
+        response = await client.get("/api/v1/rooms/room-1/messages?cursor=MQ==&offset=5")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
+class TestRoomPageCache:
+    """Tests for cached GET /api/v1/rooms/{room_id}/messages responses."""
+
+    async def test_get_messages_served_from_cache(self, client, page_cache, seed_messages):
+        """A cached page is returned as stored until the room changes."""
+        room_id = "room-cached"
+        await seed_messages(room_id, 1)
+
+        first = await client.get(f"/api/v1/rooms/{room_id}/messages")
+        assert first.status_code == status.HTTP_200_OK
+        assert len(page_cache.pages) == 1
+
+        second = await client.get(f"/api/v1/rooms/{room_id}/messages")
+        assert second.status_code == status.HTTP_200_OK
+        assert second.content == first.content
+
+    async def test_create_message_invalidates_room_pages(self, client, page_cache):
+        """POST /api/v1/messages drops the cached pages of the message's room."""
+        room_id = "room-invalidate"
+        await client.post("/api/v1/messages", json={"room_id": room_id, "sender": "user-1", "content": "First"})
+        await client.get(f"/api/v1/rooms/{room_id}/messages")
+
+        await client.post("/api/v1/messages", json={"room_id": room_id, "sender": "user-2", "content": "Second"})
+        response = await client.get(f"/api/v1/rooms/{room_id}/messages")
+
+        assert [item["content"] for item in response.json()["items"]] == ["First", "Second"]
+
+    async def test_page_read_before_a_write_is_not_cached(self, client, page_cache, seed_messages, monkeypatch):
+        """A page built from rows read before a concurrent write commits is served but not cached."""
+        room_id = "room-race"
+        await seed_messages(room_id, 1)
+
+        async def read_then_concurrent_write(*args, **kwargs):
+            page = await get_messages_by_room(*args, **kwargs)
+            # A POST commits and invalidates the room after the rows were read
+            await page_cache.invalidate(room_id)
+            return page
+
+        monkeypatch.setattr("app.api.messages.get_messages_by_room", read_then_concurrent_write)
+
+        response = await client.get(f"/api/v1/rooms/{room_id}/messages")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert page_cache.pages == {}
@@ -1,60 +1,139 @@
 """Pytest configuration and fixtures."""
 
+from contextlib import asynccontextmanager
+
 import pytest
 import pytest_asyncio
-from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
+from app.core.cache import RoomPageCache, get_page_cache
 from app.db.base import Base
 from app.db.session import get_db
 from app.main import app
+from app.models.message import Message
+from app.services.messages_cache import RoomPrefixCache
+from app.services.write_queue import MessageWriteQueue, get_write_queue
 
 
-# Create file-based SQLite database for tests (more reliable than :memory:)
-TEST_DB_PATH = "./test_messages.db"
-SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
-
-test_engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=False,
-)
-TestAsyncSessionLocal = async_sessionmaker(
-    test_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
+# Durability is irrelevant for the throwaway test database
+TEST_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
 )
 
 
-@pytest_asyncio.fixture(scope="function")
-async def db_session():
-    """Create a fresh async database session for each test."""
-    # Drop all tables first to ensure clean state
-    async with test_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        # Create tables
+def apply_test_pragmas(dbapi_connection, connection_record):
+    """Apply TEST_SQLITE_PRAGMAS to each new DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    for pragma in TEST_SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+@pytest.fixture(autouse=True)
+def room_prefix_cache(monkeypatch: pytest.MonkeyPatch) -> RoomPrefixCache:
+    """Give every test an empty room prefix cache, so cached pages never leak across rolled-back tests."""
+    cache = RoomPrefixCache()
+    monkeypatch.setattr("app.services.messages.room_prefix_cache", cache)
+    return cache
+
+
+@pytest_asyncio.fixture(scope="session")
+async def in_memory_engine():
+    """Create one in-memory SQLite engine and schema for the whole test session."""
+    # StaticPool reuses one connection, so every checkout sees the same in-memory schema.
+    # A larger compiled-statement cache keeps every test's statement shapes compiled once.
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        poolclass=StaticPool,
+        query_cache_size=1200,
+    )
+
+    # The sqlite3 driver manages transactions itself and breaks SAVEPOINT
+    # semantics; let SQLAlchemy emit BEGIN so rollbacks undo released savepoints
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        apply_test_pragmas(dbapi_connection, connection_record)
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    
-    async with TestAsyncSessionLocal() as session:
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def in_memory_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Build the session factory for in-memory tests once; each test binds it to its connection."""
+    # Commits inside a test release a SAVEPOINT; the outer transaction is never committed
+    return async_sessionmaker(expire_on_commit=False, join_transaction_mode="create_savepoint")
+
+
+@pytest_asyncio.fixture(scope="function")
+async def in_memory_db(in_memory_engine: AsyncEngine, in_memory_sessionmaker: async_sessionmaker[AsyncSession]):
+    """Provide an in-memory database session rolled back after each test."""
+    async with in_memory_engine.connect() as conn:
+        trans = await conn.begin()
+        session = in_memory_sessionmaker(bind=conn)
         try:
             yield session
         finally:
             await session.close()
-            # Clean up tables (but keep the file to avoid Windows file locking issues)
-            async with test_engine.begin() as conn:
-                await conn.run_sync(Base.metadata.drop_all)
+            await trans.rollback()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def http_client():
+    """Serve the app in-process on the test event loop for the whole session."""
+    # ASGITransport skips the lifespan: the schema comes from in_memory_engine
+    # and each test installs its own write queue
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as http_client:
+        yield http_client
 
 
-@pytest.fixture(scope="function")
-def client(db_session: AsyncSession):
-    """Create a test client with overridden database dependency."""
+@pytest_asyncio.fixture(scope="function")
+async def client(http_client: AsyncClient, in_memory_db: AsyncSession):
+    """Provide the shared HTTP client with per-test database, write queue and page cache overrides."""
     async def override_get_db():
         try:
-            yield db_session
+            yield in_memory_db
         finally:
             pass
 
+    @asynccontextmanager
+    async def test_session():
+        yield in_memory_db
+
+    write_queue = MessageWriteQueue(test_session)
+
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
+    app.dependency_overrides[get_write_queue] = lambda: write_queue
+    # Never touch a Redis configured via REDIS_URL; the page_cache fixture opts in to caching
+    app.dependency_overrides[get_page_cache] = lambda: RoomPageCache(None)
+    yield http_client
+    await write_queue.stop()
     app.dependency_overrides.clear()
 
+
+@pytest.fixture
+def seed_messages(in_memory_db: AsyncSession):
+    """Return a helper that bulk-inserts `n` messages into a room and returns their ids."""
+    async def seed(room_id: str, n: int) -> list[int]:
+        rows = [{"room_id": room_id, "sender": f"user-{i}", "content": f"Message {i}"} for i in range(n)]
+        stmt = insert(Message).returning(Message.id, sort_by_parameter_order=True)
+        result = await in_memory_db.scalars(stmt, rows)
+        ids = list(result.all())
+        await in_memory_db.commit()
+        return ids
+
+    return seed
@@ -0,0 +1,105 @@
+"""Tests for the Redis room page cache."""
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from redis.asyncio.client import Pipeline
+
+from app.core.cache import RoomPageCache
+
+TTL = 60
+
+
+@pytest.fixture
+def server() -> FakeServer:
+    """Give every test its own empty Redis server."""
+    return FakeServer()
+
+
+@pytest.fixture
+def redis(server: FakeServer) -> FakeAsyncRedis:
+    """Client for inspecting the server the cache writes to."""
+    return FakeAsyncRedis(server=server)
+
+
+@pytest.fixture
+def cache(server: FakeServer) -> RoomPageCache:
+    """Page cache backed by the test server."""
+    return RoomPageCache(FakeAsyncRedis(server=server), ttl=TTL)
+
+
+class TestRoomPageCache:
+    """Tests for RoomPageCache versioning on Redis."""
+
+    async def test_miss_then_hit(self, cache: RoomPageCache):
+        """A page is missing until set at the version returned by get."""
+        # Arrange
+        payload, version = await cache.get("room-1", "page-1")
+        
+        # Act
+        await cache.set("room-1", version, "page-1", b"[]")
+        
+        # Assert
+        assert payload is None
+        assert await cache.get("room-1", "page-1") == (b"[]", version)
+
+    async def test_invalidate_moves_room_to_new_version(self, cache: RoomPageCache):
+        """Invalidating a room bumps its version and hides pages of the old one."""
+        # Arrange
+        _, version = await cache.get("room-1", "page-1")
+        await cache.set("room-1", version, "page-1", b"[]")
+        
+        # Act
+        await cache.invalidate("room-1")
+        
+        # Assert
+        assert await cache.get("room-1", "page-1") == (None, version + 1)
+
+    async def test_set_with_stale_version_is_dropped(self, cache: RoomPageCache, redis: FakeAsyncRedis):
+        """A page built before an invalidation is not stored under any version."""
+        # Arrange
+        _, version = await cache.get("room-1", "page-1")
+        await cache.invalidate("room-1")
+        
+        # Act
+        await cache.set("room-1", version, "page-1", b"stale")
+        
+        # Assert
+        assert await cache.get("room-1", "page-1") == (None, version + 1)
+        assert await redis.keys("msg-cache:room:room-1:0") == []
+
+    async def test_invalidation_between_watch_and_exec_is_swallowed(
+        self, cache: RoomPageCache, redis: FakeAsyncRedis, monkeypatch: pytest.MonkeyPatch
+    ):
+        """An invalidation racing set() aborts the transaction without raising."""
+        # Arrange
+        _, version = await cache.get("room-1", "page-1")
+        watched_get = Pipeline.get
+
+        async def get_then_invalidate(pipe, key):
+            # Runs after WATCH: the version check passes, then another client bumps it
+            value = await watched_get(pipe, key)
+            await redis.incr(key)
+            return value
+
+        monkeypatch.setattr(Pipeline, "get", get_then_invalidate)
+        
+        # Act
+        await cache.set("room-1", version, "page-1", b"stale")
+        
+        # Assert
+        assert await redis.hget("msg-cache:room:room-1:0", "page-1") is None
+
+    async def test_version_key_outlives_pages(self, cache: RoomPageCache, redis: FakeAsyncRedis):
+        """The version key expires after twice the page TTL, on invalidate and on set."""
+        # Arrange
+        await cache.invalidate("room-1")
+        invalidate_ttl = await redis.ttl("msg-cache:room:room-1:v")
+        await redis.expire("msg-cache:room:room-1:v", 1)
+        
+        # Act
+        await cache.set("room-1", 1, "page-1", b"[]")
+        
+        # Assert
+        assert invalidate_ttl == 2 * TTL
+        assert await redis.ttl("msg-cache:room:room-1:v") == 2 * TTL
+        assert await redis.ttl("msg-cache:room:room-1:1") == TTL
@@ -1,43 +1,47 @@
 """Data access layer tests for messages."""
 
+import re
 from datetime import datetime
+from functools import lru_cache
 
 import pytest
 import pytest_asyncio
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import bindparam, delete, event, func, insert, inspect, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from app.dal.messages import create_message, get_messages_by_room
-from app.db.base import Base
+from app.dal.messages import create_message, create_messages, get_messages_by_room
 from app.models.message import Message
 from app.schemas.message import MessageCreate
 
 
-@pytest_asyncio.fixture(scope="function")
-async def in_memory_db():
-    """Create an in-memory SQLite database for DAL tests."""
-    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    
-    AsyncSessionLocal = async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.drop_all)
+PAGINATED_ROOM_ID = "room-paginated"
+
+
+@lru_cache(maxsize=None)
+def golden_count_sql() -> str:
+    """Compile the expected room COUNT(*) statement once for the SQLite dialect."""
+    stmt = select(func.count()).select_from(Message).where(Message.room_id == bindparam("room_id"))
+    return str(stmt.compile(dialect=sqlite.dialect()))
+
+
+@pytest_asyncio.fixture(scope="module")
+async def paginated_room(in_memory_engine: AsyncEngine):
+    """Commit 10 messages to one room for the whole module and return their ids in order."""
+    rows = [{"room_id": PAGINATED_ROOM_ID, "sender": f"user-{i}", "content": f"Message {i}"} for i in range(10)]
+    async with in_memory_engine.begin() as conn:
+        result = await conn.execute(insert(Message).returning(Message.id, sort_by_parameter_order=True), rows)
+        ids = list(result.scalars().all())
+    yield ids
+    async with in_memory_engine.begin() as conn:
+        await conn.execute(delete(Message).where(Message.room_id == PAGINATED_ROOM_ID))
 
 
 class TestMessageModel:
     """Tests for Message ORM model behavior."""
 
     async def test_message_creation(self, in_memory_db: AsyncSession):
-        """Message can be created and persisted with all required fields."""
+        """Message can be persisted with all required fields and a database-generated created_at."""
         # Arrange & Act
         message = Message(
             room_id="room-1",
@@ -55,24 +59,6 @@ class TestMessageModel:
         assert message.content == "Test message"
         assert isinstance(message.created_at, datetime)
 
-    async def test_message_created_at_auto_generated(self, in_memory_db: AsyncSession):
-        """Message created_at timestamp is automatically generated."""
-        # Arrange & Act
-        message = Message(
-            room_id="room-2",
-            sender="user-2",
-            content="Another message",
-        )
-        in_memory_db.add(message)
-        await in_memory_db.commit()
-        await in_memory_db.refresh(message)
-        
-        # Assert
-        assert message.created_at is not None
-        assert isinstance(message.created_at, datetime)
-        # The key behavior is that the database auto-generates the timestamp
-        # We verify it's set and is a valid datetime, which confirms server_default worked
-
     async def test_message_allows_empty_content(self, in_memory_db: AsyncSession):
         """Message can be created with empty content string."""
         # Arrange & Act
@@ -90,27 +76,28 @@ class TestMessageModel:
         assert message.id is not None
 
     async def test_message_room_id_indexed(self, in_memory_db: AsyncSession):
-        """Message room_id field is indexed for efficient queries."""
-        # This is a structural test - we verify the index exists by checking
-        # that queries by room_id are efficient (behavioral test)
-        # Create messages in different rooms
-        for room_id in ["room-a", "room-b", "room-a"]:
-            message = Message(
-                room_id=room_id,
-                sender="user-1",
-                content="Message",
-            )
-            in_memory_db.add(message)
-        await in_memory_db.commit()
+        """Message table has an index leading with room_id for efficient room queries."""
+        # Act
+        conn = await in_memory_db.connection()
+        indexes = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_indexes("messages"))
         
-        # Query should efficiently filter by room_id
-        from sqlalchemy import select
-        query = select(Message).where(Message.room_id == "room-a")
-        result = await in_memory_db.execute(query)
-        results = list(result.scalars().all())
+        # Assert
+        assert any(ix["column_names"][0] == "room_id" for ix in indexes)
+
+    async def test_room_page_query_reads_index_in_order(self, in_memory_db: AsyncSession):
+        """Room pages ordered by (created_at, id) come straight from the composite index, without a sort."""
+        # Act
+        result = await in_memory_db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT * FROM messages "
+                "WHERE room_id = 'room-1' ORDER BY created_at, id LIMIT 10"
+            )
+        )
+        plan = " ".join(row[-1] for row in result)
         
-        assert len(results) == 2
-        assert all(msg.room_id == "room-a" for msg in results)
+        # Assert
+        assert "ix_messages_room_created_id" in plan
+        assert "TEMP B-TREE" not in plan
 
 
 class TestCreateMessageDAL:
@@ -133,27 +120,34 @@ class TestCreateMessageDAL:
         assert result.room_id == "room-100"
         assert result.sender == "user-100"
         assert result.content == "Persisted message"
+        assert result.created_at is not None
         
         # Verify it's actually in the database
         retrieved = await in_memory_db.get(Message, result.id)
         assert retrieved is not None
         assert retrieved.room_id == "room-100"
 
-    async def test_create_message_returns_refreshed_instance(self, in_memory_db: AsyncSession):
-        """create_message returns message with database-generated fields populated."""
+    async def test_create_message_runs_one_statement(self, in_memory_db: AsyncSession, in_memory_engine: AsyncEngine):
+        """create_message inserts and reads back the row in a single statement."""
         # Arrange
-        data = MessageCreate(
-            room_id="room-101",
-            sender="user-101",
-            content="Test",
-        )
-        
-        # Act
-        result = await create_message(in_memory_db, data)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        data = MessageCreate(room_id="room-102", sender="user-102", content="One round-trip")
+        event.listen(in_memory_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            # Act
+            result = await create_message(in_memory_db, data)
+        finally:
+            event.remove(in_memory_engine.sync_engine, "before_cursor_execute", capture)
         
-        # Assert
-        assert result.id is not None  # ID should be populated
-        assert result.created_at is not None  # Timestamp should be populated
+        # Assert - transaction control (BEGIN/SAVEPOINT) aside, only the INSERT ... RETURNING runs
+        queries = [statement for statement in statements if not re.match(r"(BEGIN|SAVEPOINT|RELEASE|ROLLBACK)", statement)]
+        assert len(queries) == 1
+        assert queries[0].startswith("INSERT INTO messages")
+        assert result.content == "One round-trip"
 
     async def test_create_multiple_messages_different_rooms(self, in_memory_db: AsyncSession):
         """Multiple messages can be created in different rooms."""
@@ -175,143 +169,152 @@ class TestCreateMessageDAL:
         assert messages[2].room_id == "room-2"
 
 
+class TestCreateMessagesDAL:
+    """DAL tests for create_messages function."""
+
+    async def test_create_messages_persists_batch_in_order(self, in_memory_db: AsyncSession):
+        """create_messages stores every item and returns them in input order with ids populated."""
+        # Arrange
+        items = [
+            MessageCreate(room_id="room-batch", sender=f"user-{i}", content=f"Message {i}")
+            for i in range(3)
+        ]
+        
+        # Act
+        result = await create_messages(in_memory_db, items)
+        
+        # Assert
+        assert [msg.content for msg in result] == ["Message 0", "Message 1", "Message 2"]
+        assert all(msg.id is not None and msg.created_at is not None for msg in result)
+        _, total = await get_messages_by_room(in_memory_db, "room-batch", limit=10, include_total=True)
+        assert total == 3
+
+
 class TestGetMessagesByRoomDAL:
     """DAL tests for get_messages_by_room function."""
 
-    async def test_get_messages_by_room_returns_correct_messages(self, in_memory_db: AsyncSession):
+    async def test_get_messages_by_room_returns_correct_messages(self, in_memory_db: AsyncSession, seed_messages):
         """get_messages_by_room returns only messages for specified room."""
         # Arrange - Create messages in different rooms
-        room_a_messages = []
-        for i in range(3):
-            data = MessageCreate(
-                room_id="room-a",
-                sender=f"user-{i}",
-                content=f"Message {i}",
-            )
-            room_a_messages.append(await create_message(in_memory_db, data))
-        
-        # Create message in different room
-        data = MessageCreate(
-            room_id="room-b",
-            sender="user-x",
-            content="Other room message",
-        )
-        await create_message(in_memory_db, data)
+        room_a_ids = await seed_messages("room-a", 3)
+        await seed_messages("room-b", 1)
         
         # Act
-        messages, total = await get_messages_by_room(in_memory_db, "room-a", limit=10, offset=0)
+        messages, total = await get_messages_by_room(in_memory_db, "room-a", limit=10, offset=0, include_total=True)
         
         # Assert
         assert total == 3
         assert len(messages) == 3
         assert all(msg.room_id == "room-a" for msg in messages)
-        assert all(msg.id in [m.id for m in room_a_messages] for msg in messages)
+        assert all(msg.id in room_a_ids for msg in messages)
 
-    async def test_get_messages_by_room_pagination_limit(self, in_memory_db: AsyncSession):
-        """get_messages_by_room respects limit parameter."""
-        # Arrange - Create 5 messages
-        for i in range(5):
-            data = MessageCreate(
-                room_id="room-pag",
-                sender=f"user-{i}",
-                content=f"Message {i}",
-            )
-            await create_message(in_memory_db, data)
-        
+    @pytest.mark.parametrize(
+        ("limit", "offset", "expected_positions"),
+        [
+            (3, 0, [0, 1, 2]),
+            (2, 2, [2, 3]),
+            (5, 8, [8, 9]),
+            (10, 100, []),
+        ],
+    )
+    async def test_get_messages_by_room_pagination(
+        self, in_memory_db: AsyncSession, paginated_room: list[int], limit, offset, expected_positions
+    ):
+        """get_messages_by_room applies limit/offset and reports the whole room as total."""
         # Act
-        messages, total = await get_messages_by_room(in_memory_db, "room-pag", limit=3, offset=0)
-        
-        # Assert
-        assert total == 5
-        assert len(messages) == 3
-
-    async def test_get_messages_by_room_pagination_offset(self, in_memory_db: AsyncSession):
-        """get_messages_by_room respects offset parameter."""
-        # Arrange - Create 5 messages
-        created_messages = []
-        for i in range(5):
-            data = MessageCreate(
-                room_id="room-offset",
-                sender=f"user-{i}",
-                content=f"Message {i}",
-            )
-            created_messages.append(await create_message(in_memory_db, data))
-        
-        # Act - Get messages with offset
-        messages, total = await get_messages_by_room(in_memory_db, "room-offset", limit=2, offset=2)
+        messages, total = await get_messages_by_room(
+            in_memory_db, PAGINATED_ROOM_ID, limit=limit, offset=offset, include_total=True
+        )
         
         # Assert
-        assert total == 5
-        assert len(messages) == 2
-        # Should skip first 2 messages
-        assert messages[0].id == created_messages[2].id
-        assert messages[1].id == created_messages[3].id
+        assert [msg.id for msg in messages] == [paginated_room[i] for i in expected_positions]
+        assert total == len(paginated_room)
 
     async def test_get_messages_by_room_orders_by_created_at_ascending(self, in_memory_db: AsyncSession):
         """get_messages_by_room returns messages ordered by created_at ascending."""
-        # Arrange - Create messages with small delays to ensure different timestamps
-        import asyncio
-        created_messages = []
-        for i in range(3):
-            data = MessageCreate(
+        # Arrange - Insert newest first with explicit timestamps, so id order differs from time order
+        in_memory_db.add_all(
+            Message(
                 room_id="room-order",
                 sender=f"user-{i}",
                 content=f"Message {i}",
+                created_at=datetime(2024, 1, 1, 0, 0, i),
             )
-            created_messages.append(await create_message(in_memory_db, data))
-            await asyncio.sleep(0.01)  # Small delay to ensure different timestamps
+            for i in reversed(range(3))
+        )
+        await in_memory_db.commit()
         
         # Act
-        messages, total = await get_messages_by_room(in_memory_db, "room-order", limit=10, offset=0)
+        messages, total = await get_messages_by_room(in_memory_db, "room-order", limit=10, offset=0, include_total=True)
         
         # Assert
         assert total == 3
-        assert len(messages) == 3
-        # Messages should be in ascending order by created_at
-        for i in range(len(messages) - 1):
-            assert messages[i].created_at <= messages[i + 1].created_at
+        assert [msg.content for msg in messages] == ["Message 0", "Message 1", "Message 2"]
+        assert [msg.created_at for msg in messages] == [datetime(2024, 1, 1, 0, 0, i) for i in range(3)]
 
     async def test_get_messages_by_room_empty_room_returns_zero_count(self, in_memory_db: AsyncSession):
         """get_messages_by_room returns empty list and zero count for non-existent room."""
         # Act
-        messages, total = await get_messages_by_room(in_memory_db, "non-existent-room", limit=10, offset=0)
+        messages, total = await get_messages_by_room(in_memory_db, "non-existent-room", limit=10, offset=0, include_total=True)
         
         # Assert
         assert messages == []
         assert total == 0
 
-    async def test_get_messages_by_room_offset_beyond_total(self, in_memory_db: AsyncSession):
-        """get_messages_by_room handles offset beyond available messages."""
-        # Arrange - Create 2 messages
-        for i in range(2):
-            data = MessageCreate(
-                room_id="room-beyond",
-                sender=f"user-{i}",
-                content=f"Message {i}",
-            )
-            await create_message(in_memory_db, data)
+    async def test_get_messages_by_room_counts_without_order_by(self, in_memory_db: AsyncSession, in_memory_engine: AsyncEngine):
+        """Room counts are exactly a filtered COUNT(*) over messages, not an ORDER BY'd page subquery."""
+        # Arrange
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(in_memory_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            # Act - an empty page runs both the inline count subquery and the standalone count
+            await get_messages_by_room(in_memory_db, "room-count-sql", limit=10, include_total=True)
+        finally:
+            event.remove(in_memory_engine.sync_engine, "before_cursor_execute", capture)
         
-        # Act - Request with offset beyond total
-        messages, total = await get_messages_by_room(in_memory_db, "room-beyond", limit=10, offset=100)
+        # Assert
+        counts = [count for statement in statements for count in re.findall(r"SELECT count\(\*\)[^()]*", statement)]
+        assert counts == [golden_count_sql(), golden_count_sql()]
+
+    async def test_get_messages_by_room_skips_total_by_default(self, in_memory_db: AsyncSession, seed_messages):
+        """get_messages_by_room does not count the room unless asked to."""
+        # Arrange
+        await seed_messages("room-no-total", 1)
+        
+        # Act
+        messages, total = await get_messages_by_room(in_memory_db, "room-no-total", limit=10)
         
         # Assert
-        assert total == 2
-        assert messages == []
+        assert len(messages) == 1
+        assert total is None
 
-    async def test_get_messages_by_room_total_count_accurate(self, in_memory_db: AsyncSession):
-        """get_messages_by_room returns accurate total count regardless of pagination."""
-        # Arrange - Create 10 messages
-        for i in range(10):
-            data = MessageCreate(
-                room_id="room-count",
-                sender=f"user-{i}",
-                content=f"Message {i}",
-            )
-            await create_message(in_memory_db, data)
+    async def test_get_messages_by_room_after_id_continues_page(self, in_memory_db: AsyncSession, seed_messages):
+        """get_messages_by_room with after_id returns messages following that message."""
+        # Arrange - Create 5 messages, sharing the same second-resolution timestamp
+        created_ids = await seed_messages("room-keyset", 5)
         
-        # Act - Request with small limit
-        messages, total = await get_messages_by_room(in_memory_db, "room-count", limit=3, offset=0)
+        # Act
+        messages, _ = await get_messages_by_room(
+            in_memory_db, "room-keyset", limit=2, after_id=created_ids[1]
+        )
         
         # Assert
-        assert len(messages) == 3
-        assert total == 10  # Total should reflect all messages, not just returned ones
+        assert [msg.id for msg in messages] == created_ids[2:4]
+
+    async def test_get_messages_by_room_after_id_total_counts_whole_room(self, in_memory_db: AsyncSession, seed_messages):
+        """get_messages_by_room total is the room size, not what remains after the cursor."""
+        # Arrange
+        created_ids = await seed_messages("room-keyset-total", 4)
+        
+        # Act
+        messages, total = await get_messages_by_room(
+            in_memory_db, "room-keyset-total", limit=10, after_id=created_ids[2], include_total=True
+        )
+        
+        # Assert
+        assert len(messages) == 1
+        assert total == 4
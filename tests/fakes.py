@@ -0,0 +1,10 @@
+"""Lightweight test doubles shared across test modules."""
+
+
+class FakeSession:
+    """Opaque stand-in for AsyncSession in tests that patch out the DAL.
+
+    Cheaper than MagicMock(spec=AsyncSession), which introspects the whole
+    session class on construction. The code under test only passes the
+    session through to (patched) DAL functions, so it needs no methods.
+    """
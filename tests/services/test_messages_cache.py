@@ -0,0 +1,99 @@
+"""Tests for the in-process room prefix cache."""
+
+from types import SimpleNamespace
+
+from app.services.messages_cache import ROW_OVERHEAD_BYTES, RoomPrefixCache
+
+
+def make_row(content: str = "Message") -> SimpleNamespace:
+    """Build a stand-in for a message row."""
+    return SimpleNamespace(id=1, room_id="room", sender="user", content=content)
+
+
+class TestRoomPrefixCache:
+    """Tests for RoomPrefixCache expiry, eviction and invalidation."""
+
+    def test_expired_prefix_is_a_miss(self):
+        """A prefix older than the TTL is not returned."""
+        # Arrange
+        cache = RoomPrefixCache(ttl=0)
+        cache.set("room-1", cache.generation(), [make_row()])
+        
+        # Act & Assert
+        assert cache.get("room-1") is None
+
+    def test_oldest_room_is_evicted_at_capacity(self):
+        """Storing a room beyond max_rooms evicts the least recently stored room."""
+        # Arrange
+        cache = RoomPrefixCache(max_rooms=2)
+        cache.set("room-1", cache.generation(), [])
+        cache.set("room-2", cache.generation(), [])
+        
+        # Act
+        cache.set("room-3", cache.generation(), [])
+        
+        # Assert
+        assert cache.get("room-1") is None
+        assert cache.get("room-2") == []
+        assert cache.get("room-3") == []
+
+    def test_oldest_room_is_evicted_over_byte_budget(self):
+        """Storing rows beyond max_bytes evicts the oldest rooms until they fit."""
+        # Arrange
+        row = make_row()
+        row_bytes = len(row.room_id) + len(row.sender) + len(row.content) + ROW_OVERHEAD_BYTES
+        cache = RoomPrefixCache(max_bytes=2 * row_bytes)
+        cache.set("room-1", cache.generation(), [row])
+        cache.set("room-2", cache.generation(), [row])
+        
+        # Act
+        cache.set("room-3", cache.generation(), [row])
+        
+        # Assert
+        assert cache.get("room-1") is None
+        assert cache.get("room-2") == [row]
+        assert cache.get("room-3") == [row]
+
+    def test_prefix_larger_than_byte_budget_is_not_stored(self):
+        """A single prefix that exceeds max_bytes is skipped."""
+        # Arrange
+        cache = RoomPrefixCache(max_bytes=ROW_OVERHEAD_BYTES)
+        
+        # Act
+        cache.set("room-1", cache.generation(), [make_row("x" * 100)])
+        
+        # Assert
+        assert cache.get("room-1") is None
+
+    def test_rows_read_before_invalidation_are_dropped(self):
+        """set() ignores rows read before the room was invalidated, but not other rooms."""
+        # Arrange
+        cache = RoomPrefixCache()
+        generation = cache.generation()
+        cache.invalidate("room-1")
+        
+        # Act
+        cache.set("room-1", generation, [make_row()])
+        cache.set("room-2", generation, [make_row()])
+        
+        # Assert
+        assert cache.get("room-1") is None
+        assert cache.get("room-2") is not None
+
+    def test_forgotten_invalidations_still_reject_older_reads(self):
+        """Rooms evicted from the invalidation map conservatively reject reads older than the eviction."""
+        # Arrange
+        cache = RoomPrefixCache(max_rooms=1)
+        generation = cache.generation()
+        cache.invalidate("room-1")
+        cache.invalidate("room-2")
+        
+        # Act
+        cache.set("room-1", generation, [make_row()])
+        
+        # Assert
+        assert cache.get("room-1") is None
+
+    def test_zero_size_disables_cache(self):
+        """A cache with size 0 reports itself disabled."""
+        assert not RoomPrefixCache(size=0).enabled
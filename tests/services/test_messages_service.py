@@ -1,156 +1,264 @@
 """Service-level tests for messages business logic."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
 
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.message import Message
 from app.schemas.message import MessageCreate
-from app.services.messages import create_message, get_messages_by_room
+from app.services import messages as messages_service
+from app.services.messages import COUNT_CACHE_MIN_TOTAL, COUNT_CACHE_TTL, create_message, create_messages_bulk, get_messages_by_room
+from app.services.messages_cache import RoomPrefixCache
+from tests.fakes import FakeSession
+
+
+@pytest.fixture(scope="module")
+def mock_db() -> FakeSession:
+    """Session stand-in shared by the module; tests only pass it through to the DAL."""
+    return FakeSession()
+
+
+@pytest.fixture(autouse=True)
+def empty_count_cache(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Give every test its own empty room-total cache."""
+    cache: dict = {}
+    monkeypatch.setattr(messages_service, "_count_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def room_prefix_cache(monkeypatch: pytest.MonkeyPatch) -> RoomPrefixCache:
+    """Disable the room prefix cache so delegation tests see every DAL call."""
+    cache = RoomPrefixCache(size=0)
+    monkeypatch.setattr("app.services.messages.room_prefix_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def mock_dal_create(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    """Replace the DAL create_message used by the service with an AsyncMock."""
+    mock = AsyncMock()
+    monkeypatch.setattr("app.services.messages.dal_create_message", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_dal_create_many(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    """Replace the DAL create_messages used by the service with an AsyncMock."""
+    mock = AsyncMock()
+    monkeypatch.setattr("app.services.messages.dal_create_messages", mock)
+    return mock
+
+
+@pytest.fixture
+def mock_dal_get(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    """Replace the DAL get_messages_by_room used by the service with an AsyncMock."""
+    mock = AsyncMock(return_value=([], 0))
+    monkeypatch.setattr("app.services.messages.dal_get_messages_by_room", mock)
+    return mock
 
 
 class TestCreateMessage:
     """Tests for create_message service function."""
 
-    async def test_create_message_success(self):
-        """Service creates message with correct data and persists it."""
-        # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        mock_message = MagicMock(spec=Message)
-        mock_message.id = 1
-        mock_message.room_id = "room-123"
-        mock_message.sender = "user-1"
-        mock_message.content = "Hello, world!"
-        
-        # Mock DAL function
-        with patch("app.services.messages.dal_create_message", new_callable=AsyncMock, return_value=mock_message) as mock_dal:
-            data = MessageCreate(
-                room_id="room-123",
-                sender="user-1",
-                content="Hello, world!",
-            )
-            
-            # Act
-            result = await create_message(mock_db, data)
-            
-            # Assert
-            assert result == mock_message
-            mock_dal.assert_called_once_with(mock_db, data)
-
-    async def test_create_message_with_empty_content(self):
-        """Service allows creating message with empty content."""
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"room_id": "room-123", "sender": "user-1", "content": "Hello, world!"},
+            {"room_id": "room-456", "sender": "user-2", "content": ""},
+            {"room_id": "room-789", "sender": "user-3", "content": "Test content"},
+        ],
+        ids=["text", "empty-content", "other-room"],
+    )
+    async def test_create_message_delegates_to_dal(self, mock_db: FakeSession, mock_dal_create: AsyncMock, payload: dict):
+        """Service passes the creation data to the DAL and returns the created message."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        mock_message = MagicMock(spec=Message)
-        mock_message.id = 2
-        mock_message.content = ""
-        
-        with patch("app.services.messages.dal_create_message", new_callable=AsyncMock, return_value=mock_message):
-            data = MessageCreate(
-                room_id="room-456",
-                sender="user-2",
-                content="",
-            )
-            
-            # Act
-            result = await create_message(mock_db, data)
-            
-            # Assert
-            assert result == mock_message
-
-    async def test_create_message_calls_dal(self):
-        """Service delegates to DAL layer."""
+        data = MessageCreate.model_construct(**payload)
+        mock_message = SimpleNamespace(id=1, **payload)
+        mock_dal_create.return_value = mock_message
+        
+        # Act
+        result = await create_message(mock_db, data)
+        
+        # Assert
+        assert result == mock_message
+        mock_dal_create.assert_called_once_with(mock_db, data)
+
+
+class TestCreateMessagesBulk:
+    """Tests for create_messages_bulk service function."""
+
+    async def test_create_messages_bulk_delegates_in_one_call(self, mock_db: FakeSession, mock_dal_create_many: AsyncMock):
+        """Service hands the whole batch to the DAL once and returns the created messages."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        mock_message = MagicMock(spec=Message)
-        
-        with patch("app.services.messages.dal_create_message", new_callable=AsyncMock, return_value=mock_message) as mock_dal:
-            data = MessageCreate(
-                room_id="room-789",
-                sender="user-3",
-                content="Test content",
-            )
-            
-            # Act
-            result = await create_message(mock_db, data)
-            
-            # Assert
-            assert result == mock_message
-            mock_dal.assert_called_once_with(mock_db, data)
+        items = [
+            MessageCreate.model_construct(room_id="room-1", sender=f"user-{i}", content=f"Message {i}")
+            for i in range(3)
+        ]
+        created = [SimpleNamespace(id=i) for i in range(3)]
+        mock_dal_create_many.return_value = created
+        
+        # Act
+        result = await create_messages_bulk(mock_db, items)
+        
+        # Assert
+        assert result == created
+        mock_dal_create_many.assert_called_once_with(mock_db, items)
 
 
 class TestGetMessagesByRoom:
     """Tests for get_messages_by_room service function."""
 
-    async def test_get_messages_by_room_returns_paginated_results(self):
-        """Service returns messages and total count for a room."""
+    @pytest.mark.parametrize(
+        ("room_id", "limit", "offset", "dal_result"),
+        [
+            ("room-1", 3, 0, ([SimpleNamespace(id=i, room_id="room-1") for i in (1, 2, 3)], 5)),
+            ("room-1", 3, 3, ([SimpleNamespace(id=4, room_id="room-1")], 5)),
+            ("empty-room", 10, 0, ([], 0)),
+            ("specific-room", 20, 0, ([], 0)),
+        ],
+        ids=["first-page", "offset-page", "empty-room", "other-room"],
+    )
+    async def test_get_messages_by_room_delegates_to_dal(
+        self, mock_db: FakeSession, mock_dal_get: AsyncMock, room_id, limit, offset, dal_result
+    ):
+        """Service forwards room, limit and offset to the DAL and returns its page and total."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        mock_messages = [
-            MagicMock(spec=Message, id=1, room_id="room-1"),
-            MagicMock(spec=Message, id=2, room_id="room-1"),
-            MagicMock(spec=Message, id=3, room_id="room-1"),
-        ]
+        mock_dal_get.return_value = dal_result
+        
+        # Act
+        messages, total = await get_messages_by_room(mock_db, room_id, limit=limit, offset=offset)
+        
+        # Assert
+        assert (messages, total) == dal_result
+        mock_dal_get.assert_called_once_with(mock_db, room_id, limit, offset, after_id=None, include_total=False)
+
+    async def test_get_messages_by_room_with_after_id(self, mock_db: FakeSession, mock_dal_get: AsyncMock):
+        """Service passes the keyset cursor through to the DAL."""
+        # Arrange
+        mock_messages = [SimpleNamespace(id=4, room_id="room-1")]
+        mock_dal_get.return_value = (mock_messages, None)
+        
+        # Act
+        messages, total = await get_messages_by_room(mock_db, "room-1", limit=3, after_id=3)
         
-        with patch("app.services.messages.dal_get_messages_by_room", new_callable=AsyncMock, return_value=(mock_messages, 5)) as mock_dal:
-            # Act
-            messages, total = await get_messages_by_room(mock_db, "room-1", limit=3, offset=0)
-            
-            # Assert
-            assert messages == mock_messages
-            assert total == 5
-            mock_dal.assert_called_once_with(mock_db, "room-1", 3, 0)
-
-    async def test_get_messages_by_room_with_offset(self):
-        """Service correctly applies offset for pagination."""
+        # Assert
+        assert messages == mock_messages
+        assert total is None
+        mock_dal_get.assert_called_once_with(mock_db, "room-1", 3, 0, after_id=3, include_total=False)
+
+    async def test_get_messages_by_room_reuses_large_room_total(self, mock_db: FakeSession, mock_dal_get: AsyncMock):
+        """Service caches the total of a large room and skips counting on the next request."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        mock_messages = [MagicMock(spec=Message, id=4, room_id="room-1")]
-        
-        with patch("app.services.messages.dal_get_messages_by_room", new_callable=AsyncMock, return_value=(mock_messages, 5)) as mock_dal:
-            # Act
-            messages, total = await get_messages_by_room(mock_db, "room-1", limit=3, offset=3)
-            
-            # Assert
-            assert len(messages) == 1
-            assert total == 5
-            mock_dal.assert_called_once_with(mock_db, "room-1", 3, 3)
-
-    async def test_get_messages_by_room_empty_room(self):
-        """Service returns empty list and zero count for room with no messages."""
+        mock_dal_get.return_value = ([], COUNT_CACHE_MIN_TOTAL)
+        await get_messages_by_room(mock_db, "big-room", limit=10, include_total=True)
+        mock_dal_get.reset_mock()
+        mock_dal_get.return_value = ([], None)
+        
+        # Act
+        messages, total = await get_messages_by_room(mock_db, "big-room", limit=10, offset=10, include_total=True)
+        
+        # Assert
+        assert total == COUNT_CACHE_MIN_TOTAL
+        mock_dal_get.assert_called_once_with(mock_db, "big-room", 10, 10, after_id=None)
+
+    async def test_get_messages_by_room_counts_small_room_every_time(self, mock_db: FakeSession, mock_dal_get: AsyncMock, empty_count_cache: dict):
+        """Service does not cache totals of rooms below the caching threshold."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        
-        with patch("app.services.messages.dal_get_messages_by_room", new_callable=AsyncMock, return_value=([], 0)) as mock_dal:
-            # Act
-            messages, total = await get_messages_by_room(mock_db, "empty-room", limit=10, offset=0)
-            
-            # Assert
-            assert messages == []
-            assert total == 0
-            mock_dal.assert_called_once_with(mock_db, "empty-room", 10, 0)
-
-    async def test_get_messages_by_room_filters_by_room_id(self):
-        """Service delegates room filtering to DAL."""
+        mock_dal_get.return_value = ([], COUNT_CACHE_MIN_TOTAL - 1)
+        
+        # Act
+        await get_messages_by_room(mock_db, "small-room", limit=10, include_total=True)
+        await get_messages_by_room(mock_db, "small-room", limit=10, include_total=True)
+        
+        # Assert
+        assert empty_count_cache == {}
+        assert mock_dal_get.call_count == 2
+        assert mock_dal_get.call_args.kwargs["include_total"] is True
+
+    async def test_get_messages_by_room_drops_expired_total(self, mock_db: FakeSession, mock_dal_get: AsyncMock, empty_count_cache: dict):
+        """Service deletes a stale room total and counts the room again."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
+        empty_count_cache["big-room"] = (COUNT_CACHE_MIN_TOTAL, time.monotonic() - COUNT_CACHE_TTL)
+        mock_dal_get.return_value = ([], None)
         
-        with patch("app.services.messages.dal_get_messages_by_room", new_callable=AsyncMock, return_value=([], 0)) as mock_dal:
-            # Act
-            await get_messages_by_room(mock_db, "specific-room", limit=20, offset=0)
-            
-            # Assert
-            mock_dal.assert_called_once_with(mock_db, "specific-room", 20, 0)
+        # Act
+        await get_messages_by_room(mock_db, "big-room", limit=10, include_total=True)
+        
+        # Assert
+        assert empty_count_cache == {}
+        assert mock_dal_get.call_args.kwargs["include_total"] is True
 
-    async def test_get_messages_by_room_calls_dal(self):
-        """Service delegates to DAL when getting messages by room."""
+    async def test_get_messages_by_room_caps_cached_totals(
+        self, mock_db: FakeSession, mock_dal_get: AsyncMock, empty_count_cache: dict, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Service evicts the oldest room total once the cache is full."""
         # Arrange
-        mock_db = MagicMock(spec=AsyncSession)
-        
-        with patch("app.services.messages.dal_get_messages_by_room", new_callable=AsyncMock, return_value=([], 0)) as mock_dal:
-            # Act
-            await get_messages_by_room(mock_db, "room-1", limit=10, offset=0)
-            
-            # Assert
-            mock_dal.assert_called_once_with(mock_db, "room-1", 10, 0)
+        monkeypatch.setattr(messages_service, "COUNT_CACHE_MAX_ROOMS", 2)
+        mock_dal_get.return_value = ([], COUNT_CACHE_MIN_TOTAL)
+        
+        # Act
+        for room_id in ("room-1", "room-2", "room-3"):
+            await get_messages_by_room(mock_db, room_id, limit=10, include_total=True)
+        
+        # Assert
+        assert list(empty_count_cache) == ["room-2", "room-3"]
+
+
+class TestRoomPrefixCaching:
+    """Tests for serving offset pages from the room prefix cache."""
+
+    @pytest.fixture
+    def prefix_cache(self, monkeypatch: pytest.MonkeyPatch) -> RoomPrefixCache:
+        """Enable a small prefix cache for the service."""
+        cache = RoomPrefixCache(size=5)
+        monkeypatch.setattr("app.services.messages.room_prefix_cache", cache)
+        return cache
+
+    async def test_offset_pages_within_prefix_share_one_query(self, mock_db: FakeSession, mock_dal_get: AsyncMock, prefix_cache: RoomPrefixCache):
+        """Pages inside the cached prefix are sliced from one DAL read, with the total of a short room."""
+        # Arrange
+        rows = [SimpleNamespace(id=i, room_id="room-1", sender="user-1", content=f"Message {i}") for i in range(3)]
+        mock_dal_get.return_value = (rows, None)
+        
+        # Act
+        first, _ = await get_messages_by_room(mock_db, "room-1", limit=2, offset=0)
+        second, total = await get_messages_by_room(mock_db, "room-1", limit=2, offset=2, include_total=True)
+        
+        # Assert
+        assert first == rows[:2]
+        assert second == rows[2:]
+        assert total == 3
+        mock_dal_get.assert_called_once_with(mock_db, "room-1", 5)
+
+    async def test_create_message_invalidates_room_prefix(self, mock_db: FakeSession, mock_dal_create: AsyncMock, prefix_cache: RoomPrefixCache):
+        """Creating a message drops the cached prefix of its room."""
+        # Arrange
+        row = SimpleNamespace(id=1, room_id="room-1", sender="user-1", content="Old")
+        prefix_cache.set("room-1", prefix_cache.generation(), [row])
+        data = MessageCreate.model_construct(room_id="room-1", sender="user-1", content="New")
+        
+        # Act
+        await create_message(mock_db, data)
+        
+        # Assert
+        assert prefix_cache.get("room-1") is None
+
+    async def test_prefix_read_racing_a_write_is_not_cached(self, mock_db: FakeSession, mock_dal_get: AsyncMock, prefix_cache: RoomPrefixCache):
+        """A prefix read that a write in the same room overtook is served but not stored."""
+        # Arrange
+        rows = [SimpleNamespace(id=1, room_id="room-1", sender="user-1", content="Stale")]
+
+        async def read_then_write(*args, **kwargs):
+            prefix_cache.invalidate("room-1")
+            return rows, None
+
+        mock_dal_get.side_effect = read_then_write
+        
+        # Act
+        messages, _ = await get_messages_by_room(mock_db, "room-1", limit=2)
+        
+        # Assert
+        assert messages == rows
+        assert prefix_cache.get("room-1") is None
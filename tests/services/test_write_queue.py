@@ -0,0 +1,71 @@
+"""Service-level tests for the batched message write queue."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.schemas.message import MessageCreate
+from app.services.write_queue import MessageWriteQueue
+from tests.fakes import FakeSession
+
+
+@asynccontextmanager
+async def fake_session_factory():
+    """Yield a fake session in place of a real one."""
+    yield FakeSession()
+
+
+class TestMessageWriteQueue:
+    """Tests for MessageWriteQueue batching."""
+
+    async def test_concurrent_submits_share_one_batch(self):
+        """Messages submitted together are written with a single DAL call."""
+        # Arrange
+        queue = MessageWriteQueue(fake_session_factory, max_wait=0.05)
+        items = [
+            MessageCreate.model_construct(room_id="room-1", sender=f"user-{i}", content=f"Message {i}")
+            for i in range(3)
+        ]
+        created = [SimpleNamespace(id=i) for i in range(3)]
+
+        with patch("app.services.write_queue.create_messages_bulk", new_callable=AsyncMock, return_value=created) as mock_dal:
+            # Act
+            results = await asyncio.gather(*(queue.submit(item) for item in items))
+            await queue.stop()
+
+            # Assert
+            assert results == created
+            mock_dal.assert_called_once()
+            assert mock_dal.call_args[0][1] == items
+
+    async def test_isolated_submit_does_not_wait_for_batch_window(self):
+        """A message submitted with nothing else queued is written without waiting for max_wait."""
+        # Arrange
+        queue = MessageWriteQueue(fake_session_factory, max_wait=60)
+        data = MessageCreate.model_construct(room_id="room-1", sender="user-1", content="Message")
+        created = SimpleNamespace(id=1)
+
+        with patch("app.services.write_queue.create_messages_bulk", new_callable=AsyncMock, return_value=[created]):
+            # Act
+            async with asyncio.timeout(1):
+                result = await queue.submit(data)
+            await queue.stop()
+
+            # Assert
+            assert result is created
+
+    async def test_batch_failure_propagates_to_callers(self):
+        """A failed batch write raises in every caller of that batch."""
+        # Arrange
+        queue = MessageWriteQueue(fake_session_factory)
+        data = MessageCreate.model_construct(room_id="room-1", sender="user-1", content="Message")
+
+        with patch("app.services.write_queue.create_messages_bulk", new_callable=AsyncMock, side_effect=SQLAlchemyError("boom")):
+            # Act & Assert
+            with pytest.raises(SQLAlchemyError):
+                await queue.submit(data)
+            await queue.stop()